@@ -1,4 +1,5 @@
 pip install --upgrade pip wheel
 uv pip install torch==2.4.1+cpu -f https://download.pytorch.org/whl/torch_stable.html
+uv pip install "optimum[onnxruntime]==1.21.4" || echo "Optimum install failed"
 uv pip install plotly==5.15.0 matplotlib==3.9.2
 uv pip install -r requirements.txt